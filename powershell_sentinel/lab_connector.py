@@ -7,12 +7,11 @@ import base64
 import time
 import winrm
 import splunklib.client as client
-import splunklib.results as results
 from winrm.exceptions import WinRMError, WinRMTransportError, WinRMOperationTimeoutError
 from dotenv import load_dotenv
 from pydantic import ValidationError
-from typing import List
-from .models import CommandOutput, SplunkLogEvent
+from typing import List, Optional
+from .models import CommandOutput, SplunkLogEvent, SplunkSearchResults
 from rich.console import Console
 
 load_dotenv()
@@ -30,7 +29,7 @@ POWERSHELL_HYBRID_WRAPPER = """
 $commandToRun = @'
 {command}
 '@
-$timeoutSeconds = 25
+$timeoutSeconds = {timeout_sec}
 $result = @{{
     Stdout = ""
     Stderr = ""
@@ -64,6 +63,17 @@ try {{
 $result | ConvertTo-Json -Compress
 """
 
+def _read_results(stream) -> List[SplunkLogEvent]:
+    """
+    Parses and validates a Splunk output_mode=json response in a single pass. A finished
+    job or oneshot search returns one document with every row under 'results'; a search
+    with no results may return an empty body.
+    """
+    raw = stream.read()
+    if not raw.strip():
+        return []
+    return SplunkSearchResults.model_validate_json(raw).results
+
 class LabConnection:
     def __init__(self):
         self.winrm_protocol = None
@@ -120,7 +130,7 @@ class LabConnection:
             console.print(f"[bold red]...FATAL: Failed to re-establish connection after reset! Error: {e}[/bold red]")
             return False
 
-    def run_remote_powershell(self, command: str) -> CommandOutput:
+    def run_remote_powershell(self, command: str, timeout_sec: int = 25) -> CommandOutput:
         if not self.shell_id or not self.winrm_protocol:
              # If the connection is dead, try to reset it.
              if not self.reset_shell():
@@ -129,7 +139,7 @@ class LabConnection:
         try:
             # safe_command = command.replace("'", "''")
             # final_script = POWERSHELL_HYBRID_WRAPPER.format(command=safe_command)
-            final_script = POWERSHELL_HYBRID_WRAPPER.format(command=command)
+            final_script = POWERSHELL_HYBRID_WRAPPER.format(command=command, timeout_sec=timeout_sec)
             encoded_script = base64.b64encode(final_script.encode('utf-16-le')).decode('ascii')
             command_id = self.winrm_protocol.run_command(self.shell_id, 'powershell.exe', ['-EncodedCommand', encoded_script])
             stdout, stderr, return_code = self.winrm_protocol.get_command_output(self.shell_id, command_id)
@@ -156,8 +166,43 @@ class LabConnection:
             search_query = "search " + search_query
         try:
             job = self.splunk_service.jobs.create(search_query, **kwargs_search)
-            reader = results.JSONResultsReader(job.results(output_mode='json'))
-            return [SplunkLogEvent.model_validate(item) for item in reader if isinstance(item, dict)]
+            try:
+                # The blocking job is already done: one fetch of every row (count=0 lifts
+                # the default 100-row page), no refresh of the job metadata.
+                return _read_results(job.results(output_mode='json', count=0, offset=0))
+            finally:
+                job.cancel()
         except Exception as e:
             print(f"Warning: A Splunk query failed. Error: {e}", file=sys.stderr)
-            return []
\ No newline at end of file
+            return []
+
+    def query_splunk_blocking(self, search_query: str, max_wait: int = 60, earliest_time: str = "-1m") -> Optional[SplunkLogEvent]:
+        """
+        Waits up to max_wait seconds for the first event matching search_query.
+        Each attempt is a single oneshot search (no job to dispatch, poll or cancel);
+        an empty result means the event is not indexed yet and is retried with
+        exponential backoff. A failed query is not retried.
+        """
+        if not search_query.strip().startswith('search'):
+            search_query = "search " + search_query
+        # Resolved once: jobs is a property that builds a new collection on every access.
+        oneshot = self.splunk_service.jobs.oneshot
+        deadline = time.monotonic() + max_wait
+        delay = 0.1
+        while True:
+            remaining = deadline - time.monotonic()
+            try:
+                stream = oneshot(
+                    search_query, earliest_time=earliest_time, output_mode="json",
+                    count=1, max_time=max(1, int(remaining)))
+                logs = _read_results(stream)
+                if logs:
+                    return logs[0]
+            except Exception as e:
+                print(f"Warning: A Splunk query failed. Error: {e}", file=sys.stderr)
+                return None
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+            time.sleep(min(delay, remaining))
+            delay = min(delay * 2, 5)
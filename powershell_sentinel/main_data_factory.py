@@ -3,6 +3,10 @@ import argparse
 import os
 import subprocess
 import itertools
+import atexit
+import base64
+import queue
+import threading
 from datetime import datetime
 from typing import List, Tuple, Set, Dict, Any
 
@@ -11,7 +15,6 @@ from rich.progress import Progress, BarColumn, TextColumn, TimeRemainingColumn
 from rich.console import Console
 
 from powershell_sentinel.models_legacy import Primitive, TrainingPair, LLMResponse, Analysis, CommandOutput
-from powershell_sentinel.lab_connector import LabConnection
 
 # --- V2 CONFIGURATION ---
 # Default file paths
@@ -54,6 +57,18 @@ def generate_all_recipes() -> List[List[str]]:
             recipes.append(arg_recipe + finisher)
     return recipes
 
+def _load_completed_jobs(completion_log_path: str, console: Console) -> Set[Tuple[str, Tuple[str, ...]]]:
+    completed_jobs = set()
+    if os.path.exists(completion_log_path):
+        try:
+            with open(completion_log_path, 'r', encoding='utf-8') as f:
+                # --- THIS IS THE FIX ---
+                # Explicitly convert the inner list (the recipe) to a tuple
+                completed_jobs = {(job[0], tuple(job[1])) for job in json.load(f)}
+        except (json.JSONDecodeError):
+             console.print(f"[bold yellow]Warning: Could not load completion log at {completion_log_path}. Starting fresh.[/bold yellow]")
+    return completed_jobs
+
 def load_state(output_path: str, completion_log_path: str) -> Tuple[List[TrainingPair], Set[Tuple[str, Tuple[str, ...]]]]:
     console = Console()
     generated_pairs = []
@@ -64,44 +79,122 @@ def load_state(output_path: str, completion_log_path: str) -> Tuple[List[Trainin
             generated_pairs = [TrainingPair.model_validate(p) for p in loaded_json]
         except (json.JSONDecodeError, ValidationError) as e:
             console.print(f"[bold yellow]Warning: Could not load dataset at {output_path}. Starting fresh. Error: {e}[/bold yellow]")
-    completed_jobs = set()
-    if os.path.exists(completion_log_path):
-        try:
-            with open(completion_log_path, 'r', encoding='utf-8') as f:
-                # --- THIS IS THE FIX ---
-                # Explicitly convert the inner list (the recipe) to a tuple
-                completed_jobs = {(job[0], tuple(job[1])) for job in json.load(f)}
-        except (json.JSONDecodeError):
-             console.print(f"[bold yellow]Warning: Could not load completion log at {completion_log_path}. Starting fresh.[/bold yellow]")
+    completed_jobs = _load_completed_jobs(completion_log_path, console)
     console.print(f"Resuming. Found {len(generated_pairs)} existing pairs and {len(completed_jobs)} completed jobs.")
     return generated_pairs, completed_jobs
 
+def load_state_raw(output_path: str, completion_log_path: str) -> Tuple[bytes, Set[Tuple[str, Tuple[str, ...]]]]:
+    """Like load_state, but returns the dataset file's bytes as-is instead of validating them into models."""
+    pairs_json = b"[]"
+    if os.path.exists(output_path):
+        with open(output_path, 'rb') as f:
+            pairs_json = f.read()
+    return pairs_json, _load_completed_jobs(completion_log_path, Console())
+
 def save_state(generated_pairs: List[TrainingPair], completed_jobs: Set, output_path: str, completion_log_path: str):
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump([p.model_dump(mode='json') for p in generated_pairs], f, indent=2)
+    pairs_json = json.dumps([p.model_dump(mode='json') for p in generated_pairs], indent=2).encode('utf-8')
+    save_state_raw(pairs_json, completed_jobs, output_path, completion_log_path)
+
+def save_state_raw(pairs_json: bytes, completed_jobs: Set, output_path: str, completion_log_path: str):
+    """Writes an already-serialized dataset alongside the completion log."""
+    with open(output_path, 'wb') as f:
+        f.write(pairs_json)
     with open(completion_log_path, 'w', encoding='utf-8') as f:
         json.dump([list(job) for job in completed_jobs], f, indent=2)
 
+def load_primitives(primitives_path: str) -> List[Primitive]:
+    with open(primitives_path, 'r', encoding='utf-8') as f:
+        return [Primitive.model_validate(p) for p in json.load(f)]
+
 def log_audit_event(primitive_id: str, recipe: List[str], status: str, details: str = "", audit_log_path: str = AUDIT_LOG_FILE):
     log_entry = {"timestamp": datetime.now().isoformat(), "primitive_id": primitive_id, "recipe": recipe, "status": status, "details": details.strip()}
     with open(audit_log_path, 'a', encoding='utf-8') as f:
         f.write(json.dumps(log_entry) + "\n")
 
+class PwshWorker:
+    """
+    A persistent PowerShell process with the obfuscation module pre-loaded.
+
+    Each request is written to stdin as a single-line script and answered with
+    one marked JSON line on stdout, so a dataset run pays for one process start
+    instead of one per technique invocation. A dead or hung process is discarded
+    and transparently restarted on the next request.
+    """
+    RESPONSE_MARKER = "##SENTINEL_RESPONSE##"
+
+    def __init__(self, module_path: str = OBFUSCATION_MODULE_PATH, timeout: int = 60):
+        self.module_path = module_path
+        self.timeout = timeout
+        self._process = None
+        self._responses = None
+
+    def start(self):
+        """Starts the PowerShell process if it is not already running."""
+        if self._process is not None and self._process.poll() is None:
+            return
+        self._process = subprocess.Popen(
+            ["powershell.exe", "-NoLogo", "-NoProfile", "-ExecutionPolicy", "Bypass", "-Command", "-"],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            text=True, encoding='utf-8', bufsize=1
+        )
+        self._responses = queue.Queue()
+        threading.Thread(target=self._read_responses, args=(self._process.stdout, self._responses), daemon=True).start()
+        self._send(f"[Console]::OutputEncoding = [Text.Encoding]::UTF8; $ErrorActionPreference = 'Stop'; Import-Module -Name '{self.module_path}'")
+
+    def close(self):
+        """Shuts the PowerShell process down, killing it if it does not exit promptly."""
+        if self._process is None:
+            return
+        try:
+            self._process.stdin.close()
+            self._process.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            self._process.kill()
+        self._process = None
+
+    def invoke(self, command: str, technique: str) -> Tuple[bool, str]:
+        self.start()
+        # Base64 keeps arbitrary quoting and newlines in the command out of the request line.
+        encoded_command = base64.b64encode(command.encode('utf-8')).decode('ascii')
+        self._send(
+            f"try {{ $out = {technique} -Command ([Text.Encoding]::UTF8.GetString([Convert]::FromBase64String('{encoded_command}'))) | Out-String; "
+            f"$reply = @{{ ok = $true; out = $out.Trim() }} }} "
+            f"catch {{ $reply = @{{ ok = $false; out = $_.Exception.Message }} }}; "
+            f"'{self.RESPONSE_MARKER}' + ($reply | ConvertTo-Json -Compress)"
+        )
+        try:
+            response = self._responses.get(timeout=self.timeout)
+        except queue.Empty:
+            self.close()
+            return False, "ENGINE_ERROR: PowerShell process timed out."
+        if response is None:
+            self.close()
+            return False, "ENGINE_ERROR: PowerShell process exited unexpectedly."
+        reply = json.loads(response)
+        if not reply['ok']:
+            return False, f"ENGINE_ERROR: {reply['out']}"
+        return True, reply['out']
+
+    def _send(self, script: str):
+        self._process.stdin.write(script + "\n")
+        self._process.stdin.flush()
+
+    @classmethod
+    def _read_responses(cls, stream, responses: queue.Queue):
+        """Forwards marked reply lines to the queue; anything else the module prints is ignored."""
+        for line in stream:
+            if line.startswith(cls.RESPONSE_MARKER):
+                responses.put(line[len(cls.RESPONSE_MARKER):])
+        responses.put(None)
+
+ENGINE_WORKER = PwshWorker()
+atexit.register(ENGINE_WORKER.close)
+
 def invoke_sentinel_engine(command: str, technique: str) -> Tuple[bool, str]:
     try:
-        # Use a list of arguments for better handling of paths and commands with spaces
-        ps_args = [
-            "powershell.exe",
-            "-ExecutionPolicy", "Bypass",
-            "-Command", f"Import-Module -Name '{OBFUSCATION_MODULE_PATH}'; {technique} -Command \"{command.replace('"', '`"')}\""
-        ]
-        result = subprocess.run(ps_args, capture_output=True, text=True, encoding='utf-8', timeout=60, check=False)
-        if result.returncode != 0:
-            return False, f"ENGINE_ERROR: PowerShell process exited with code {result.returncode}. Stderr: {result.stderr}"
-        return True, result.stdout.strip()
-    except subprocess.TimeoutExpired:
-        return False, "ENGINE_ERROR: PowerShell process timed out."
+        return ENGINE_WORKER.invoke(command, technique)
     except Exception as e:
+        ENGINE_WORKER.close()
         return False, f"ENGINE_ERROR: Unexpected Python error: {e}"
 
 # --- V2 MAIN ORCHESTRATOR ---
@@ -111,8 +204,7 @@ def main(primitives_path: str, dry_run: bool):
     
     # --- Load Primitives ---
     try:
-        with open(primitives_path, 'r', encoding='utf-8') as f:
-            all_primitives = [Primitive.model_validate(p) for p in json.load(f)]
+        all_primitives = load_primitives(primitives_path)
         console.print(f"Successfully loaded and validated {len(all_primitives)} primitives.")
     except (FileNotFoundError, ValidationError, json.JSONDecodeError) as e:
         console.print(f"[bold red]FATAL: Error loading primitives: {e}[/bold red]"); return
@@ -131,6 +223,8 @@ def main(primitives_path: str, dry_run: bool):
     total_jobs = len(all_primitives) * len(all_recipes)
 
     # --- Initialize Lab Connection ---
+    # Imported here so the pure helpers above can be used without pulling in WinRM/Splunk.
+    from powershell_sentinel.lab_connector import LabConnection
     console.print("Initializing lab connection...")
     try: lab = LabConnection(); console.print("Lab connection successful.")
     except Exception as e: console.print(f"[bold red]FATAL: Lab connection failed: {e}[/bold red]"); return
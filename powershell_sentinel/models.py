@@ -61,6 +61,11 @@ class SplunkLogEvent(BaseModel):
     sourcetype: str
     model_config = ConfigDict(extra='ignore')
 
+class SplunkSearchResults(BaseModel):
+    """The output_mode=json envelope of a finished Splunk search; only the rows are kept."""
+    results: List[SplunkLogEvent] = []
+    model_config = ConfigDict(extra='ignore')
+
 class ExtractionMethodEnum(str, Enum):
     REGEX = "regex"
     KEY_VALUE = "key_value"
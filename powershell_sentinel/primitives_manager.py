@@ -21,9 +21,10 @@ import json
 import os
 import re
 import time
-import shutil
-from typing import List, Dict, Optional, Type
-from pydantic import BaseModel, ValidationError
+import zipfile
+from functools import lru_cache
+from typing import List, Dict, Optional, Type, Iterable, Iterator, Tuple
+from pydantic import BaseModel, TypeAdapter, ValidationError
 
 from rich.console import Console
 from rich.prompt import Prompt, Confirm
@@ -33,6 +34,29 @@ from powershell_sentinel.models import Primitive, SplunkLogEvent, TelemetryRule,
 from powershell_sentinel.lab_connector import LabConnection
 from powershell_sentinel.modules import snapshot_differ, statistics_calculator, recommendation_engine, rule_formatter
 
+@lru_cache(maxsize=None)
+def _list_adapter(model: Type[BaseModel]) -> TypeAdapter:
+    """One List[model] adapter per model, so a file is parsed and validated in a single pass."""
+    return TypeAdapter(List[model])
+
+@lru_cache(maxsize=None)
+def _load_mitre_library(mitre_lib_path: str) -> Dict:
+    """The MITRE library is static reference data, so each path is read once per process; treat it as read-only."""
+    with open(mitre_lib_path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+@lru_cache(maxsize=None)
+def _extraction_regex(extraction_method: ExtractionMethodEnum, detail_key_or_pattern: str) -> Optional[re.Pattern]:
+    """Compiles a parsing rule's extraction pattern once, however many logs it is applied to."""
+    if extraction_method == ExtractionMethodEnum.REGEX:
+        return re.compile(detail_key_or_pattern, re.DOTALL)
+    elif extraction_method == ExtractionMethodEnum.KEY_VALUE:
+        return re.compile(re.escape(detail_key_or_pattern) + r'=(.*?)(?:\s*\w+=|$)', re.DOTALL)
+    return None
+
+# Classic (non-XML) Windows event logs carry their Event ID as an EventCode=<n> field.
+_EVENT_CODE_RE = re.compile(r'EventCode=(\d+)')
+
 class PrimitivesManager:
     """An interactive CLI for managing the primitives knowledge base and parsing rules."""
 
@@ -47,20 +71,35 @@ class PrimitivesManager:
         self.lab = LabConnection()
         self.primitives: List[Primitive] = self._load_and_validate(self.primitives_path, Primitive)
         self.parsing_rules: List[ParsingRule] = self._load_and_validate(self.parsing_rules_path, ParsingRule, default=[])
-        with open(self.mitre_lib_path, 'r', encoding='utf-8') as f:
-            self.mitre_ttp_library = json.load(f)
+        self.mitre_ttp_library = _load_mitre_library(self.mitre_lib_path)
+
+    @property
+    def parsing_rules(self) -> List[ParsingRule]:
+        return self._parsing_rules
+
+    @parsing_rules.setter
+    def parsing_rules(self, rules: List[ParsingRule]):
+        self._parsing_rules = rules
+        self._rules_by_event_id: Optional[Dict[int, List[ParsingRule]]] = None
+
+    def _get_rules_by_event_id(self) -> Dict[int, List[ParsingRule]]:
+        """Indexes the parsing rules by Event ID, keeping their order; rebuilt after the rules change."""
+        if self._rules_by_event_id is None:
+            self._rules_by_event_id = {}
+            for rule in self.parsing_rules:
+                self._rules_by_event_id.setdefault(rule.event_id, []).append(rule)
+        return self._rules_by_event_id
 
     def _load_and_validate(self, path: str, model: Type[BaseModel], default: Optional[list] = None) -> List[BaseModel]:
         """Generic loader for our JSON data files, with Pydantic validation."""
         if not os.path.exists(path) and default is not None:
             return default
         try:
-            with open(path, 'r', encoding='utf-8') as f:
+            with open(path, 'rb') as f:
                 content = f.read()
-                if not content:
-                    return default if default is not None else []
-                data = json.loads(content)
-            return [model.model_validate(item) for item in data]
+            if not content:
+                return default if default is not None else []
+            return _list_adapter(model).validate_json(content)
         except (FileNotFoundError, json.JSONDecodeError, ValidationError) as e:
             self.console.print(f"[bold red]Error loading or validating {path}: {e}[/bold red]")
             exit(1)
@@ -69,16 +108,21 @@ class PrimitivesManager:
         """Generic saver for our Pydantic model lists or dictionaries."""
         self.console.print(f"Saving data to [cyan]{path}[/]...")
         
-        data_to_dump = data
-        if isinstance(data, list) and all(isinstance(p, BaseModel) for p in data):
-             data_to_dump = [p.model_dump(mode='json', by_alias=True) for p in data]
-        elif isinstance(data, dict):
-            data_to_dump = {k: [i.model_dump(mode='json', by_alias=True) for i in v] if isinstance(v, list) else v for k, v in data.items()}
+        if isinstance(data, list) and data and all(type(p) is type(data[0]) and isinstance(p, BaseModel) for p in data):
+            # A list of one model serializes straight to JSON bytes, with no intermediate dicts.
+            payload = _list_adapter(type(data[0])).dump_json(data, indent=2, by_alias=True)
+        else:
+            data_to_dump = data
+            if isinstance(data, list) and all(isinstance(p, BaseModel) for p in data):
+                 data_to_dump = [p.model_dump(mode='json', by_alias=True) for p in data]
+            elif isinstance(data, dict):
+                data_to_dump = {k: [i.model_dump(mode='json', by_alias=True) for i in v] if isinstance(v, list) else v for k, v in data.items()}
+            payload = json.dumps(data_to_dump, indent=2).encode('utf-8')
 
         try:
             os.makedirs(os.path.dirname(path), exist_ok=True)
-            with open(path, 'w', encoding='utf-8') as f:
-                json.dump(data_to_dump, f, indent=2)
+            with open(path, 'wb') as f:
+                f.write(payload)
             self.console.print("[green]Save successful.[/green]")
         except IOError as e:
             self.console.print(f"[bold red]Error saving file {path}: {e}[/bold red]")
@@ -231,25 +275,28 @@ class PrimitivesManager:
         self.console.print("\n--- Telemetry Discovery Complete ---", style="bold blue")
 
     def _apply_parsing_rule(self, rule: ParsingRule, raw_text: str) -> Optional[str]:
-        if rule.extraction_method == ExtractionMethodEnum.REGEX:
-            match = re.search(rule.detail_key_or_pattern, raw_text, re.DOTALL)
-            return match.group(1).strip() if match and match.groups() else None
-        elif rule.extraction_method == ExtractionMethodEnum.KEY_VALUE:
-            pattern = re.escape(rule.detail_key_or_pattern) + r'=(.*?)(?:\s*\w+=|$)'
-            match = re.search(pattern, raw_text, re.DOTALL)
-            return match.group(1).strip() if match and match.groups() else None
-        return None
+        pattern = _extraction_regex(rule.extraction_method, rule.detail_key_or_pattern)
+        if pattern is None:
+            return None
+        match = pattern.search(raw_text)
+        return match.group(1).strip() if match and match.groups() else None
 
     def _parse_log_with_rules(self, log: SplunkLogEvent) -> Optional[TelemetryRule]:
         """Finds the first applicable parsing rule and uses it to parse a raw log."""
-        for rule in self.parsing_rules:
-            if str(rule.event_id) in log.raw:
-                if rule.source_match and rule.source_match not in log.raw:
-                    continue 
-                
-                details = self._apply_parsing_rule(rule, log.raw)
-                if details:
-                    return TelemetryRule(source=log.source, event_id=rule.event_id, details=details)
+        event_code = _EVENT_CODE_RE.search(log.raw)
+        if event_code:
+            candidate_rules = self._get_rules_by_event_id().get(int(event_code.group(1)), [])
+        else:
+            # No EventCode field (e.g. XML-rendered events): fall back to finding the ID anywhere in the log.
+            candidate_rules = [rule for rule in self.parsing_rules if str(rule.event_id) in log.raw]
+
+        for rule in candidate_rules:
+            if rule.source_match and rule.source_match not in log.raw:
+                continue 
+            
+            details = self._apply_parsing_rule(rule, log.raw)
+            if details:
+                return TelemetryRule(source=log.source, event_id=rule.event_id, details=details)
         return None
 
     def _prompt_for_new_parsing_rule(self, log: SplunkLogEvent) -> Optional[TelemetryRule]:
@@ -289,7 +336,7 @@ class PrimitivesManager:
             detail_key_or_pattern=detail_key_or_pattern
         )
 
-        self.parsing_rules.append(new_rule)
+        self.parsing_rules = self.parsing_rules + [new_rule]
         self._save_json(self.parsing_rules_path, self.parsing_rules)
         self.console.print(f"[green]New parsing rule '{rule_name}' saved.[/green]")
         
@@ -357,11 +404,29 @@ class PrimitivesManager:
         self._save_json(self.primitives_path, self.primitives)
         self.console.print("\n--- Telemetry Curation Complete ---", style="bold blue")
 
-    def dump_unparsed_logs(self):
-        """Finds all logs that can't be parsed by current rules and dumps them to a file."""
-        self.console.print("\n--- Dumping Unparsed Logs for Review ---", style="bold blue")
-        unparsed_logs_collection: List[SplunkLogEvent] = []
-        
+    def _write_jsonl(self, path: str, lines: Iterable[bytes]) -> int:
+        """
+        Streams JSON lines to a file as they are produced, so a dump never holds the whole
+        collection in memory. The file is only created once there is a line to write.
+        """
+        count = 0
+        f = None
+        try:
+            for line in lines:
+                if f is None:
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    f = open(path, 'wb')
+                f.write(line + b"\n")
+                count += 1
+        except IOError as e:
+            self.console.print(f"[bold red]Error saving file {path}: {e}[/bold red]")
+        finally:
+            if f is not None:
+                f.close()
+        return count
+
+    def _iter_unparsed_logs(self) -> Iterator[SplunkLogEvent]:
+        """Yields every delta log that none of the current parsing rules can parse."""
         for primitive in self.primitives:
             delta_log_path = os.path.join(self.deltas_path, f"{primitive.primitive_id}.json")
             if not os.path.exists(delta_log_path):
@@ -372,7 +437,26 @@ class PrimitivesManager:
             
             for log in raw_logs:
                 if self._parse_log_with_rules(log) is None:
-                    unparsed_logs_collection.append(log)
+                    yield log
+
+    def dump_unparsed_logs(self, format: str = "json"):
+        """
+        Finds all logs that can't be parsed by current rules and dumps them to a file.
+        With format="jsonl" each log is written as its own line as soon as it is found.
+        """
+        self.console.print("\n--- Dumping Unparsed Logs for Review ---", style="bold blue")
+
+        if format == "jsonl":
+            output_path = os.path.join(self.parsing_logs_path, "unparsed_for_review.jsonl")
+            count = self._write_jsonl(output_path, (log.model_dump_json(by_alias=True).encode('utf-8') for log in self._iter_unparsed_logs()))
+            if not count:
+                self.console.print("[green]No unparsed logs found. All telemetry is accounted for![/green]")
+                return
+            self.console.print(f"\nFound {count} unparsed logs.")
+            self.console.print(f"Dumped unparsed logs to [cyan]{output_path}[/cyan]")
+            return
+
+        unparsed_logs_collection: List[SplunkLogEvent] = list(self._iter_unparsed_logs())
         
         if not unparsed_logs_collection:
             self.console.print("[green]No unparsed logs found. All telemetry is accounted for![/green]")
@@ -383,14 +467,8 @@ class PrimitivesManager:
         self._save_json(output_path, unparsed_logs_collection)
         self.console.print(f"Dumped unparsed logs to [cyan]{output_path}[/cyan]")
 
-    def dump_uncurated_logs(self):
-        """
-        Finds all parsed logs for primitives that haven't been curated yet and
-        dumps them to a single file for efficient, offline review.
-        """
-        self.console.print("\n--- Dumping Uncurated Logs for Review ---", style="bold blue")
-        uncurated_data: Dict[str, List[TelemetryRule]] = {}
-        
+    def _iter_uncurated_logs(self) -> Iterator[Tuple[str, List[TelemetryRule]]]:
+        """Yields (primitive_id, parsed logs) for each uncurated primitive with parseable logs."""
         for primitive in self.primitives:
             if primitive.telemetry_rules:
                 continue
@@ -409,7 +487,31 @@ class PrimitivesManager:
                     parsed_logs_for_primitive.append(parsed_rule)
             
             if parsed_logs_for_primitive:
-                uncurated_data[primitive.primitive_id] = parsed_logs_for_primitive
+                yield primitive.primitive_id, parsed_logs_for_primitive
+
+    def dump_uncurated_logs(self, format: str = "json"):
+        """
+        Finds all parsed logs for primitives that haven't been curated yet and
+        dumps them to a single file for efficient, offline review. With format="jsonl"
+        each primitive is written as its own {primitive_id: [...]} line as soon as it is parsed.
+        """
+        self.console.print("\n--- Dumping Uncurated Logs for Review ---", style="bold blue")
+
+        if format == "jsonl":
+            output_path = os.path.join(self.curating_logs_path, "uncurated_for_review.jsonl")
+            lines = (
+                json.dumps({primitive_id: [rule.model_dump(mode='json', by_alias=True) for rule in rules]}).encode('utf-8')
+                for primitive_id, rules in self._iter_uncurated_logs()
+            )
+            count = self._write_jsonl(output_path, lines)
+            if not count:
+                self.console.print("[green]No uncurated primitives with parseable logs found.[/green]")
+                return
+            self.console.print(f"\nFound {count} primitives with uncurated logs.")
+            self.console.print(f"Dumped uncurated logs to [cyan]{output_path}[/cyan]")
+            return
+
+        uncurated_data: Dict[str, List[TelemetryRule]] = dict(self._iter_uncurated_logs())
 
         if not uncurated_data:
             self.console.print("[green]No uncurated primitives with parseable logs found.[/green]")
@@ -420,8 +522,8 @@ class PrimitivesManager:
         self._save_json(output_path, uncurated_data)
         self.console.print(f"Dumped uncurated logs to [cyan]{output_path}[/cyan]")
 
-    def _assemble_review_package(self):
-        """Assembles and zips the practitioner review package."""
+    def _assemble_review_package(self, output_path: str = "practitioner_package.zip"):
+        """Assembles the practitioner review package, writing each entry straight into the zip."""
         self.console.print("\n--- [bold blue]Assembling Practitioner Review Package[/bold blue] ---")
         
         review_primitive_ids = [
@@ -429,55 +531,35 @@ class PrimitivesManager:
             'PS-019', 'PS-022', 'PS-028', 'PS-034', 'PS-038', 'PS-040', 'PS-042', 
             'PS-044', 'PS-045', 'PS-047', 'PS-048', 'PS-049', 'PS-050'
         ]
-        
-        package_dir = "./practitioner_package"
-        
-        if os.path.exists(package_dir):
-            shutil.rmtree(package_dir)
-        os.makedirs(package_dir)
-
-        instructions_path = os.path.join(package_dir, "INSTRUCTIONS.md")
-        with open(instructions_path, 'w', encoding='utf-8') as f:
-            f.write(self._get_practitioner_instructions())
 
         primitive_map = {p.primitive_id: p for p in self.primitives}
 
-        for pid in review_primitive_ids:
-            if pid not in primitive_map:
-                self.console.print(f"[yellow]Warning: Primitive ID '{pid}' not found. Skipping.[/yellow]")
-                continue
-
-            primitive = primitive_map[pid]
-            delta_log_path = os.path.join(self.deltas_path, f"{pid}.json")
+        with zipfile.ZipFile(output_path, 'w', zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr("INSTRUCTIONS.md", self._get_practitioner_instructions())
 
-            if not os.path.exists(delta_log_path):
-                self.console.print(f"[yellow]Warning: Delta log for '{pid}' not found. Skipping.[/yellow]")
-                continue
+            for pid in review_primitive_ids:
+                if pid not in primitive_map:
+                    self.console.print(f"[yellow]Warning: Primitive ID '{pid}' not found. Skipping.[/yellow]")
+                    continue
 
-            primitive_dir = os.path.join(package_dir, pid)
-            os.makedirs(primitive_dir)
+                primitive = primitive_map[pid]
+                delta_log_path = os.path.join(self.deltas_path, f"{pid}.json")
 
-            with open(os.path.join(primitive_dir, "command.txt"), 'w', encoding='utf-8') as f:
-                f.write(primitive.primitive_command)
+                if not os.path.exists(delta_log_path):
+                    self.console.print(f"[yellow]Warning: Delta log for '{pid}' not found. Skipping.[/yellow]")
+                    continue
 
-            with open(os.path.join(primitive_dir, "context.txt"), 'w', encoding='utf-8') as f:
-                f.write("INTENT:\n")
-                for intent in primitive.intent:
-                    f.write(f"- {intent.value}\n")
-                f.write("\nMITRE TTPs:\n")
-                for ttp in primitive.mitre_ttps:
-                    f.write(f"- {ttp.value}\n")
+                zf.writestr(f"{pid}/", "")
+                zf.writestr(f"{pid}/command.txt", primitive.primitive_command)
 
-            delta_logs = self._load_and_validate(delta_log_path, SplunkLogEvent, default=[])
-            with open(os.path.join(primitive_dir, "delta_logs.json"), 'w', encoding='utf-8') as f:
-                json.dump([log.model_dump(mode='json', by_alias=True) for log in delta_logs], f, indent=2)
+                context = "INTENT:\n" + "".join(f"- {intent.value}\n" for intent in primitive.intent)
+                context += "\nMITRE TTPs:\n" + "".join(f"- {ttp.value}\n" for ttp in primitive.mitre_ttps)
+                zf.writestr(f"{pid}/context.txt", context)
 
-        zip_filename = "practitioner_package"
-        shutil.make_archive(zip_filename, 'zip', package_dir)
-        
-        shutil.rmtree(package_dir)
+                delta_logs = self._load_and_validate(delta_log_path, SplunkLogEvent, default=[])
+                zf.writestr(f"{pid}/delta_logs.json", _list_adapter(SplunkLogEvent).dump_json(delta_logs, indent=2, by_alias=True))
         
-        self.console.print(f"\n[bold green]Success![/bold green] Package created at [cyan]{zip_filename}.zip[/cyan]")
+        self.console.print(f"\n[bold green]Success![/bold green] Package created at [cyan]{output_path}[/cyan]")
 
     def _get_practitioner_instructions(self) -> str:
         """Returns the full, formatted markdown text for the practitioner instructions."""
@@ -28,16 +28,15 @@ import time
 import argparse
 from typing import List, Dict, Union
 
-# Use llama_cpp for GGUF model inference
-from llama_cpp import Llama
 from pydantic import ValidationError
 
 from rich.console import Console
 from rich.table import Table
 from rich.prompt import Prompt
 
-# Import the Pydantic models that define the data structures
-from powershell_sentinel.models import Primitive, LLMResponse, Analysis, TelemetryRule
+# Import the Pydantic models that define the data structures. The toolkit reports the
+# nested Analysis response, which only the legacy models still define.
+from powershell_sentinel.models_legacy import Primitive, LLMResponse, Analysis, TelemetryRule
 
 # The prompt template is the exact format the model was fine-tuned on.
 # Consistency is critical for reliable performance.
@@ -72,6 +71,9 @@ class SentinelToolkit:
 
         with self.console.status("Initializing toolkit... Loading model...", spinner="dots"):
             try:
+                # Use llama_cpp for GGUF model inference. Imported here so the lookup logic can be
+                # used (and tested) without the inference runtime installed.
+                from llama_cpp import Llama
                 # Load the GGUF model using llama-cpp-python for efficient CPU inference
                 self.model = Llama(model_path=model_path, verbose=False, n_ctx=2048)
             except Exception as e:
@@ -1,14 +1,13 @@
 # powershell_sentinel/utils/metrics.py
 
-from typing import List, Any, Dict
+from typing import List, Any, Dict, Sequence
+import numpy as np
 from pydantic import BaseModel
-from sklearn.preprocessing import MultiLabelBinarizer
-from sklearn.metrics import f1_score
 
 def calculate_multilabel_f1_scores(
     predictions: List[List[Any]], 
     ground_truths: List[List[Any]], 
-    all_labels: List[Any]
+    all_labels: Sequence[Any]
 ) -> dict:
     """
     Calculates macro-averaged F1 score for multi-label classification.
@@ -20,12 +19,22 @@ def calculate_multilabel_f1_scores(
     if len(predictions) != len(ground_truths):
          raise ValueError("Predictions and ground truths must have the same length.")
 
-    mlb = MultiLabelBinarizer(classes=all_labels)
-    
-    y_true = mlb.fit_transform(ground_truths)
-    y_pred = mlb.transform(predictions)
+    # One (samples x labels) indicator matrix per side; labels outside all_labels are ignored.
+    label_to_idx = {label: i for i, label in enumerate(all_labels)}
+    y_true = np.zeros((len(ground_truths), len(all_labels)), dtype=bool)
+    y_pred = np.zeros_like(y_true)
+    for matrix, rows in ((y_true, ground_truths), (y_pred, predictions)):
+        for i, row in enumerate(rows):
+            matrix[i, [label_to_idx[label] for label in row if label in label_to_idx]] = True
+
+    tp = np.count_nonzero(y_pred & y_true, axis=0)
+    fp = np.count_nonzero(y_pred & ~y_true, axis=0)
+    fn = np.count_nonzero(~y_pred & y_true, axis=0)
 
-    f1 = f1_score(y_true, y_pred, average='macro', zero_division=0)
+    # Per-label F1 is 2TP / (2TP + FP + FN), taken as 0 for labels never predicted or present.
+    denominator = 2 * tp + fp + fn
+    per_label = np.divide(2 * tp, denominator, out=np.zeros(len(all_labels)), where=denominator > 0)
+    f1 = float(per_label.mean())
     
     return {"f1_macro": f1}
 
@@ -50,11 +59,12 @@ def calculate_f1_for_telemetry(y_pred: List[List[BaseModel]], y_true: List[List[
         pred_set = to_canonical_set(pred_list)
         true_set = to_canonical_set(true_list)
 
-        intersection = pred_set.intersection(true_set)
+        # Both sides are sets, so FP and FN follow from the overlap size alone.
+        overlap = len(pred_set & true_set)
         
-        true_positives += len(intersection)
-        false_positives += len(pred_set - true_set)
-        false_negatives += len(true_set - pred_set)
+        true_positives += overlap
+        false_positives += len(pred_set) - overlap
+        false_negatives += len(true_set) - overlap
 
     precision = true_positives / (true_positives + false_positives) if (true_positives + false_positives) > 0 else 0
     recall = true_positives / (true_positives + false_negatives) if (true_positives + false_negatives) > 0 else 0
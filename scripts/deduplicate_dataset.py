@@ -1,13 +1,49 @@
 # scripts/deduplicate_dataset.py
+import io
 import json
 import argparse
 import os
+from typing import TextIO, Tuple
 
 # This script is a standalone data preparation tool. Its purpose is to take the
 # raw, contaminated output from the data factory and produce a clean, de-duplicated
 # dataset suitable for use in the MLOps pipeline.
 
-def deduplicate_dataset(input_path: str, output_path: str):
+def dedupe_by_prompt(dataset: list) -> list:
+    """
+    Returns the entries of a dataset with duplicate prompts removed, keeping the
+    first occurrence of each prompt and preserving the original order.
+    """
+    seen_prompts = set()
+    deduped_data = []
+    for item in dataset:
+        if item['prompt'] not in seen_prompts:
+            deduped_data.append(item)
+            seen_prompts.add(item['prompt'])
+    return deduped_data
+
+def deduplicate_dataset(in_fp: TextIO, out_fp: TextIO) -> Tuple[int, int]:
+    """
+    Reads a dataset from a file-like object, removes entries with duplicate
+    prompts, and writes the clean dataset to another file-like object. Nothing
+    is written if the dataset is empty.
+
+    Args:
+        in_fp (TextIO): A readable file-like object holding the raw dataset.
+        out_fp (TextIO): A writable file-like object for the clean dataset.
+
+    Returns:
+        Tuple[int, int]: The original and clean (unique) pair counts.
+    """
+    original_dataset = json.load(in_fp)
+    if not original_dataset:
+        return 0, 0
+
+    deduped_data = dedupe_by_prompt(original_dataset)
+    json.dump(deduped_data, out_fp) # Save without indent for smaller file size
+    return len(original_dataset), len(deduped_data)
+
+def deduplicate_dataset_paths(input_path: str, output_path: str):
     """
     Loads a dataset, removes entries with duplicate prompts, and saves the
     clean dataset to a new file.
@@ -19,9 +55,11 @@ def deduplicate_dataset(input_path: str, output_path: str):
     print(f"--- De-duplicating Dataset ---")
     print(f"Loading raw data from: {input_path}")
 
+    # Buffer the output so nothing is written to disk for a missing, corrupt or empty input.
+    out_buffer = io.StringIO()
     try:
         with open(input_path, 'r', encoding='utf-8') as f:
-            original_dataset = json.load(f)
+            original_count, clean_count = deduplicate_dataset(f, out_buffer)
     except FileNotFoundError:
         print(f"\n[ERROR] File not found at '{input_path}'. Please check the path.")
         return
@@ -29,28 +67,21 @@ def deduplicate_dataset(input_path: str, output_path: str):
         print(f"\n[ERROR] Could not decode JSON from '{input_path}'. The file may be corrupt.")
         return
 
-    if not original_dataset:
+    if not original_count:
         print("\n[WARNING] The dataset is empty. No action taken.")
         return
 
-    seen_prompts = set()
-    deduped_data = []
-    for item in original_dataset:
-        if item['prompt'] not in seen_prompts:
-            deduped_data.append(item)
-            seen_prompts.add(item['prompt'])
-
     # Ensure the output directory exists
     os.makedirs(os.path.dirname(output_path), exist_ok=True)
 
     print(f"Saving clean, de-duplicated data to: {output_path}")
     with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(deduped_data, f) # Save without indent for smaller file size
+        f.write(out_buffer.getvalue())
 
     print("\n--- De-duplication Report ---")
-    print(f"Original Pair Count: {len(original_dataset):,}")
-    print(f"Clean (Unique) Pair Count: {len(deduped_data):,}")
-    print(f"Removed Redundant Pairs: {len(original_dataset) - len(deduped_data):,}")
+    print(f"Original Pair Count: {original_count:,}")
+    print(f"Clean (Unique) Pair Count: {clean_count:,}")
+    print(f"Removed Redundant Pairs: {original_count - clean_count:,}")
     print("-------------------------------")
 
 if __name__ == '__main__':
@@ -69,4 +100,4 @@ if __name__ == '__main__':
         help="Path to save the clean, de-duplicated dataset file (default: data/generated/training_data_v0_clean.json)."
     )
     args = parser.parse_args()
-    deduplicate_dataset(args.input, args.output)
+    deduplicate_dataset_paths(args.input, args.output)
@@ -58,23 +58,26 @@ def analyze_variety(console: Console, dataset_path: str, data: list):
 def analyze_failures(console: Console, log_path: str):
     """Analyzes and prints the failure patterns from the log file."""
     console.print(f"\n[bold red]Stage 2: Analyzing Failure Patterns in '{log_path}'...[/bold red]")
+    primitive_failures, technique_failures = Counter(), Counter()
+    line_count = 0
     try:
+        # Stream the log rather than materializing it with readlines(); real logs run to many MB.
         with open(log_path, 'r', encoding='utf-8') as f:
-            log_lines = f.readlines()
+            for line in f:
+                line_count += 1
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                # Use .update() for primitives for consistency and testability.
+                primitive_id = record.get('primitive_id', 'Unknown')
+                primitive_failures.update([primitive_id])
+                technique_failures.update(record.get('obfuscation_chain', []))
     except FileNotFoundError:
         console.print(f"[bold red]Error: Log file not found at '{log_path}'[/bold red]")
         return
-        
-    primitive_failures, technique_failures = Counter(), Counter()
-    for line in log_lines:
-        try:
-            record = json.loads(line)
-            # Use .update() for primitives for consistency and testability.
-            primitive_id = record.get('primitive_id', 'Unknown')
-            primitive_failures.update([primitive_id])
-            technique_failures.update(record.get('obfuscation_chain', []))
-        except json.JSONDecodeError:
-            continue
             
     prim_table = Table(title=f"Most Frequent Primitive Failures (Top 10)")
     prim_table.add_column("Primitive ID", style="cyan")
@@ -90,7 +93,7 @@ def analyze_failures(console: Console, log_path: str):
 
     console.print(prim_table)
     console.print(tech_table)
-    console.print(f"[bold]Total Failures Analyzed:[/bold] {len(log_lines)}")
+    console.print(f"[bold]Total Failures Analyzed:[/bold] {line_count}")
 
 def analyze_decoded_content(console: Console, data: list, sample_size: int):
     """Analyzes and prints the variety of techniques inside Base64 payloads."""
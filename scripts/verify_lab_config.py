@@ -2,7 +2,6 @@
 
 import re
 from rich.console import Console
-from powershell_sentinel.lab_connector import LabConnection
 
 # Define the minimum required settings for our application
 REQUIRED_SETTINGS = {
@@ -31,6 +30,9 @@ def verify_lab_configuration():
     Connects to the remote lab VM and verifies its WinRM configuration
     is suitable for the high-volume data generation task.
     """
+    # Imported here so that parse_winrm_output stays importable without winrm/splunklib.
+    from powershell_sentinel.lab_connector import LabConnection
+
     console = Console()
     console.print("[bold cyan]--- Lab Configuration Verifier ---[/bold cyan]")
     try:
@@ -0,0 +1,98 @@
+# tests/conftest.py
+
+import os
+import sys
+import json
+import pytest
+
+# Same effect as PYTHONDONTWRITEBYTECODE=1 for everything imported by the test session.
+sys.dont_write_bytecode = True
+
+RUN_INTEGRATION_TESTS = bool(os.environ.get('RUN_INTEGRATION_TESTS'))
+
+
+def pytest_collection_modifyitems(config, items):
+    """Skips every test marked `integration` unless RUN_INTEGRATION_TESTS is set."""
+    if RUN_INTEGRATION_TESTS:
+        return
+    skip_integration = pytest.mark.skip(reason="Skipping integration tests. Set RUN_INTEGRATION_TESTS=1 to run.")
+    for item in items:
+        if 'integration' in item.keywords:
+            item.add_marker(skip_integration)
+
+
+@pytest.fixture(scope='session')
+def lab():
+    """
+    A single live LabConnection shared by every integration test in the session,
+    so the WinRM handshake and Splunk login are paid once per run.
+    """
+    from powershell_sentinel.lab_connector import LabConnection
+
+    print("\n--- Initializing Live Lab Connection for Integration Tests ---")
+    try:
+        connection = LabConnection()
+        print("[SUCCESS] LabConnection initialized successfully.")
+    except Exception as e:
+        pytest.skip(f"Failed to initialize LabConnection. Error: {e}")
+    yield connection
+    connection.close()
+
+
+@pytest.fixture(scope='session')
+def mock_primitives():
+    """
+    A one-primitive library for the data factory tests, handed straight to a patched
+    load_primitives. The primitive MUST have telemetry_rules to be considered "usable".
+    """
+    from powershell_sentinel.models_legacy import Primitive
+    return [Primitive.model_validate({
+        "primitive_id": "PS-001",
+        "primitive_command": "Get-Process",
+        "intent": ["Process Discovery"],
+        "mitre_ttps": ["T1057"],
+        "telemetry_rules": [{"source": "A", "event_id": 1, "details": "B"}]
+    })]
+
+
+@pytest.fixture(scope='session')
+def success_output():
+    """
+    A successful remote execution. CommandOutput MUST be created using the aliased,
+    PowerShell-style field names (PascalCase) to pass validation.
+    """
+    from powershell_sentinel.models import CommandOutput
+    return CommandOutput(ReturnCode=0, Stdout='Success', Stderr='')
+
+
+@pytest.fixture(scope='session')
+def seed_dir(tmp_path_factory):
+    """
+    A golden PrimitivesManager workspace, built once per session: the mock primitives,
+    parsing rules and MITRE library plus the empty deltas and log directories. Tests that
+    mutate it work on their own copies.
+    """
+    seed = tmp_path_factory.mktemp("seed")
+    for name in ("deltas", "parsing_logs", "curating_logs"):
+        (seed / name).mkdir()
+    (seed / "primitives.json").write_text(json.dumps([
+        {"primitive_id": "PS-001", "primitive_command": "test", "intent": ["Process Discovery"], "mitre_ttps": ["T1057"], "telemetry_rules": []},
+        {"primitive_id": "PS-002", "primitive_command": "test2", "intent": ["Process Discovery"], "mitre_ttps": ["T1057"], "telemetry_rules": [{"source": "s", "event_id": 1, "details": "d"}]}
+    ]))
+    (seed / "parsing_rules.json").write_text(json.dumps([]))
+    (seed / "mitre.json").write_text(json.dumps({
+        "T1049": {"name": "System Network Connections Discovery"},
+        "T1057": {"name": "Process Discovery"}
+    }))
+    return seed
+
+
+@pytest.fixture
+def factory_workdir(tmp_path, monkeypatch):
+    """
+    Runs a data factory test from an empty directory, so the dataset, completion log
+    and audit log that main() writes under data/generated/ land in tmp_path.
+    """
+    (tmp_path / "data" / "generated").mkdir(parents=True)
+    monkeypatch.chdir(tmp_path)
+    return tmp_path
@@ -0,0 +1,11 @@
+# tests/slow/conftest.py
+
+import pytest
+from powershell_sentinel.main_data_factory import ENGINE_WORKER
+
+@pytest.fixture(scope='session', autouse=True)
+def engine_worker():
+    """Starts the shared PowerShell worker once so every bridge test reuses the same process."""
+    ENGINE_WORKER.start()
+    yield ENGINE_WORKER
+    ENGINE_WORKER.close()
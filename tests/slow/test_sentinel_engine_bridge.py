@@ -0,0 +1,29 @@
+# tests/slow/test_sentinel_engine_bridge.py
+#
+# Tests for the Python -> PowerShell bridge. Each test spawns a real PowerShell
+# process, so this directory is excluded from default collection (see pytest.ini).
+# Run explicitly with: pytest tests/slow/
+
+import pytest
+from powershell_sentinel.main_data_factory import invoke_sentinel_engine
+
+@pytest.mark.slow
+def test_invoke_sentinel_engine_success():
+    """
+    CRITICAL: Tests the full Python -> PowerShell bridge with a valid command.
+    This test requires PowerShell and the custom module to be correctly located.
+    """
+    success, result = invoke_sentinel_engine("whoami", "Invoke-SentinelConcat")
+    assert success is True
+    assert result is not None
+    assert "whoami" not in result # The command should be obfuscated
+    assert "+'" in result or "'+'" in result # Should contain concatenation artifacts
+
+@pytest.mark.slow
+def test_invoke_sentinel_engine_ps_error():
+    """Tests if the bridge gracefully handles an error from the PowerShell script."""
+    # Pass a non-existent function name
+    success, result = invoke_sentinel_engine("whoami", "Invoke-NonExistentFunction")
+    assert success is False
+    assert "ENGINE_ERROR" in result
+    assert "is not recognized" in result # Should contain PowerShell's error message
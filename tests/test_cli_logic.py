@@ -13,25 +13,26 @@
 # tests/test_cli_logic.py
 
 import unittest
-import json
 from unittest.mock import patch, MagicMock
+from pydantic import TypeAdapter
 
 # Import the class to be tested and its required data models
 from powershell_sentinel.sentinel_toolkit import SentinelToolkit
-from powershell_sentinel.models import Primitive
+from powershell_sentinel.models_legacy import Primitive
 
+_PRIMITIVE_LIST_ADAPTER = TypeAdapter(list[Primitive])
+
+# Patch the __init__ method to prevent the real, slow model from loading during tests
+@patch('powershell_sentinel.sentinel_toolkit.SentinelToolkit.__init__', return_value=None)
 class TestCliLogic(unittest.TestCase):
 
     def setUp(self):
         """This method is run before each test."""
         # Load the test database from a dedicated test file
-        with open('tests/test_data/test_cli_lookup.json', 'r', encoding='utf-8') as f:
-            self.test_primitives_data = json.load(f)
-        # Convert the raw dictionary data into Pydantic models, just like the real app
-        self.test_primitives = [Primitive.model_validate(p) for p in self.test_primitives_data]
+        # and validate it straight from bytes into the same Pydantic models the real app uses
+        with open('tests/test_data/test_cli_lookup.json', 'rb') as f:
+            self.test_primitives = _PRIMITIVE_LIST_ADAPTER.validate_json(f.read())
 
-    # Patch the __init__ method to prevent the real, slow model from loading during tests
-    @patch('powershell_sentinel.sentinel_toolkit.SentinelToolkit.__init__', return_value=None)
     def test_threat_intel_lookup_found(self, mock_init):
         """
         Tests that the lookup feature correctly finds a known primitive and calls the display function.
@@ -43,7 +44,7 @@ class TestCliLogic(unittest.TestCase):
 
         # Mock the display function to check if it's called, and mock user input to simulate typing "Get-Service"
         with patch.object(toolkit, '_display_primitive_report') as mock_display, \
-             patch('rich.prompt.Prompt.ask', return_value='Get-Service') as mock_prompt:
+             patch('powershell_sentinel.sentinel_toolkit.Prompt.ask', autospec=True, return_value='Get-Service') as mock_prompt:
 
             # --- Act ---
             toolkit.feature_threat_intel_lookup()
@@ -60,7 +61,6 @@ class TestCliLogic(unittest.TestCase):
             # Check that the "found" message was printed to the console
             toolkit.console.print.assert_any_call("\n[green]Found entry for 'Get-Service':[/green]")
 
-    @patch('powershell_sentinel.sentinel_toolkit.SentinelToolkit.__init__', return_value=None)
     def test_threat_intel_lookup_not_found(self, mock_init):
         """
         Tests that the lookup feature correctly handles a command that does not exist.
@@ -72,7 +72,7 @@ class TestCliLogic(unittest.TestCase):
 
         # Simulate user input for a command that is not in our test DB
         with patch.object(toolkit, '_display_primitive_report') as mock_display, \
-             patch('rich.prompt.Prompt.ask', return_value='non-existent-command'):
+             patch('powershell_sentinel.sentinel_toolkit.Prompt.ask', autospec=True, return_value='non-existent-command'):
 
             # --- Act ---
             toolkit.feature_threat_intel_lookup()
@@ -82,7 +82,6 @@ class TestCliLogic(unittest.TestCase):
             # Check that the correct "not found" message was printed
             toolkit.console.print.assert_called_once_with("\n[yellow]No entry found for 'non-existent-command' in the primitives database.[/yellow]")
 
-    @patch('powershell_sentinel.sentinel_toolkit.SentinelToolkit.__init__', return_value=None)
     def test_threat_intel_lookup_case_insensitivity(self, mock_init):
         """
         Tests that the lookup feature is case-insensitive as required.
@@ -94,7 +93,7 @@ class TestCliLogic(unittest.TestCase):
 
         # Simulate user input with mixed case
         with patch.object(toolkit, '_display_primitive_report') as mock_display, \
-             patch('rich.prompt.Prompt.ask', return_value='nEt uSeR'):
+             patch('powershell_sentinel.sentinel_toolkit.Prompt.ask', autospec=True, return_value='nEt uSeR'):
 
             # --- Act ---
             toolkit.feature_threat_intel_lookup()
@@ -4,24 +4,29 @@ import pytest
 from powershell_sentinel.main_data_factory import (
     generate_all_recipes,
     load_state,
+    load_state_raw,
     save_state,
-    log_audit_event,
-    invoke_sentinel_engine,
-    EXCLUSION_LIST
+    save_state_raw,
+    log_audit_event
 )
-from powershell_sentinel.models import TrainingPair, LLMResponse, Analysis, IntentEnum, MitreTTPEnum
+from powershell_sentinel.models_legacy import TrainingPair, LLMResponse, Analysis, IntentEnum, MitreTTPEnum
+
+# --- Fixtures ---
+
+@pytest.fixture(scope='module')
+def recipes():
+    """The recipe list is deterministic, so it is generated once per module."""
+    return generate_all_recipes()
 
 # --- Unit Tests ---
 
-def test_generate_all_recipes_count():
+def test_generate_all_recipes_count(recipes):
     """Tests if the recipe generator creates the correct number of combinations."""
-    recipes = generate_all_recipes()
     # Validated Model: 76 (Argument Recipes) * 3 (Finishers) = 228
     assert len(recipes) == 228
 
-def test_generate_all_recipes_content():
+def test_generate_all_recipes_content(recipes):
     """Sanity-checks the first and last recipes."""
-    recipes = generate_all_recipes()
     # The first recipe should always be the "do nothing" recipe
     assert recipes[0] == []
     # The last recipe should be the most complex possible combination
@@ -32,8 +37,24 @@ def test_generate_all_recipes_content():
     assert 'Invoke-SentinelCommand' not in last_recipe # Command and Base64 are mutually exclusive
 
 def test_state_management(tmpdir):
-    """Tests saving and loading of the dataset and completion log."""
-    # Setup dummy data
+    """Tests the dataset and completion log round-trip byte-for-byte, without building models."""
+    output_file = os.path.join(tmpdir, "test_dataset.json")
+    log_file = os.path.join(tmpdir, "test_log.json")
+
+    canonical_pairs = (
+        b'[{"prompt": "whoami", "response": {"deobfuscated_command": "whoami", '
+        b'"analysis": {"intent": ["Process Discovery"], "mitre_ttps": ["T1057"], "telemetry_signature": []}}}]'
+    )
+    dummy_jobs = {("PS-001", ("Invoke-SentinelConcat",))}
+
+    save_state_raw(canonical_pairs, dummy_jobs, output_file, log_file)
+    loaded_bytes, loaded_jobs = load_state_raw(output_file, log_file)
+
+    assert loaded_bytes == canonical_pairs
+    assert loaded_jobs == dummy_jobs
+
+def test_state_management_validates_pairs(tmpdir):
+    """Tests the model-level save/load path, which validates pairs back into TrainingPair objects."""
     output_file = os.path.join(tmpdir, "test_dataset.json")
     log_file = os.path.join(tmpdir, "test_log.json")
 
@@ -42,15 +63,10 @@ def test_state_management(tmpdir):
     dummy_pairs = [TrainingPair(prompt="whoami", response=response)]
     dummy_jobs = {("PS-001", ("Invoke-SentinelConcat",))}
 
-    # Test saving
     save_state(dummy_pairs, dummy_jobs, output_file, log_file)
-    assert os.path.exists(output_file)
-    assert os.path.exists(log_file)
-
-    # Test loading
     loaded_pairs, loaded_jobs = load_state(output_file, log_file)
-    assert len(loaded_pairs) == 1
-    assert loaded_pairs[0].prompt == "whoami"
+
+    assert loaded_pairs == dummy_pairs
     assert ("PS-001", ("Invoke-SentinelConcat",)) in loaded_jobs
 
 def test_audit_logging(tmpdir):
@@ -65,26 +81,3 @@ def test_audit_logging(tmpdir):
         log_entry = json.loads(line)
         assert log_entry["primitive_id"] == "PS-009"
         assert log_entry["status"] == "success"
-
-# --- Integration Tests ---
-
-@pytest.mark.slow
-def test_invoke_sentinel_engine_success():
-    """
-    CRITICAL: Tests the full Python -> PowerShell bridge with a valid command.
-    This test requires PowerShell and the custom module to be correctly located.
-    """
-    success, result = invoke_sentinel_engine("whoami", "Invoke-SentinelConcat")
-    assert success is True
-    assert result is not None
-    assert "whoami" not in result # The command should be obfuscated
-    assert "+'" in result or "'+'" in result # Should contain concatenation artifacts
-
-@pytest.mark.slow
-def test_invoke_sentinel_engine_ps_error():
-    """Tests if the bridge gracefully handles an error from the PowerShell script."""
-    # Pass a non-existent function name
-    success, result = invoke_sentinel_engine("whoami", "Invoke-NonExistentFunction")
-    assert success is False
-    assert "ENGINE_ERROR" in result
-    assert "is not recognized" in result # Should contain PowerShell's error message
\ No newline at end of file
@@ -1,69 +1,63 @@
 # tests/test_data_preparation_scripts.py
-import unittest
+import io
 import json
-import os
 
-def deduplicate_dataset(input_path: str, output_path: str):
+import pytest
+
+from scripts.deduplicate_dataset import deduplicate_dataset, deduplicate_dataset_paths, dedupe_by_prompt
+
+DUMMY_DATA = [
+    {"prompt": "A", "response": "1"},
+    {"prompt": "B", "response": "2"},
+    {"prompt": "A", "response": "3"}, # Duplicate prompt
+    {"prompt": "C", "response": "4"},
+    {"prompt": "B", "response": "5"}, # Duplicate prompt
+]
+
+
+def test_deduplication_logic():
+    """
+    Tests that the deduplication logic correctly removes
+    redundant entries based on the 'prompt' key.
+    """
+    out_fp = io.StringIO()
+    counts = deduplicate_dataset(io.StringIO(json.dumps(DUMMY_DATA)), out_fp)
+
+    assert counts == (5, 3)
+    clean_data = json.loads(out_fp.getvalue())
+    assert [item['prompt'] for item in clean_data] == ["A", "B", "C"]
+
+
+def test_deduplication_paths_wrapper(tmp_path):
+    """Tests the CLI wrapper reads from and writes to real paths."""
+    input_path = tmp_path / "dummy_input.json"
+    output_path = tmp_path / "out" / "dummy_output.json"
+    input_path.write_text(json.dumps(DUMMY_DATA), encoding='utf-8')
+
+    deduplicate_dataset_paths(str(input_path), str(output_path))
+
+    clean_data = json.loads(output_path.read_text(encoding='utf-8'))
+    assert [item['prompt'] for item in clean_data] == ["A", "B", "C"]
+
+
+def test_deduplication_paths_wrapper_skips_empty_dataset(tmp_path):
+    """Tests that an empty dataset produces no output file."""
+    input_path = tmp_path / "empty.json"
+    output_path = tmp_path / "empty_output.json"
+    input_path.write_text("[]", encoding='utf-8')
+
+    deduplicate_dataset_paths(str(input_path), str(output_path))
+
+    assert not output_path.exists()
+
+
+@pytest.mark.parametrize("size, unique", [(300, 10), (300, 300)])
+def test_deduplication_keeps_first_occurrence_in_memory(size, unique):
     """
-    Loads a dataset, removes entries with duplicate prompts, and saves the
-    clean dataset to a new file.
+    Tests first-wins ordering on synthetic datasets built in memory, with and
+    without duplicates, without touching the disk.
     """
-    with open(input_path, 'r', encoding='utf-8') as f:
-        original_dataset = json.load(f)
-
-    seen_prompts = set()
-    deduped_data = []
-    for item in original_dataset:
-        if item['prompt'] not in seen_prompts:
-            deduped_data.append(item)
-            seen_prompts.add(item['prompt'])
-
-    os.makedirs(os.path.dirname(output_path), exist_ok=True)
-    with open(output_path, 'w', encoding='utf-8') as f:
-        json.dump(deduped_data, f)
-
-
-class TestDataPreparationScripts(unittest.TestCase):
-
-    def setUp(self):
-        """Set up a temporary directory and dummy data for tests."""
-        self.test_dir = "temp_test_data"
-        os.makedirs(self.test_dir, exist_ok=True)
-        self.dummy_data = [
-            {"prompt": "A", "response": "1"},
-            {"prompt": "B", "response": "2"},
-            {"prompt": "A", "response": "3"}, # Duplicate prompt
-            {"prompt": "C", "response": "4"},
-            {"prompt": "B", "response": "5"}, # Duplicate prompt
-        ]
-        self.input_path = os.path.join(self.test_dir, "dummy_input.json")
-        with open(self.input_path, "w") as f:
-            json.dump(self.dummy_data, f)
-
-    def tearDown(self):
-        """Clean up the temporary directory and files after tests."""
-        if os.path.exists(self.test_dir):
-            for file_name in os.listdir(self.test_dir):
-                os.remove(os.path.join(self.test_dir, file_name))
-            os.rmdir(self.test_dir)
-
-    def test_deduplication_logic(self):
-        """
-        Tests that the deduplication logic correctly removes
-        redundant entries based on the 'prompt' key.
-        """
-        output_path = os.path.join(self.test_dir, "dummy_output.json")
-        # Call the local version of the function
-        deduplicate_dataset(self.input_path, output_path)
-
-        self.assertTrue(os.path.exists(output_path))
-
-        with open(output_path, "r") as f:
-            clean_data = json.load(f)
-
-        self.assertEqual(len(clean_data), 3)
-        prompts = [item['prompt'] for item in clean_data]
-        self.assertListEqual(prompts, ["A", "B", "C"])
-
-if __name__ == '__main__':
-    unittest.main()
\ No newline at end of file
+    dataset = [{"prompt": f"P{i % unique}", "response": str(i)} for i in range(size)]
+    clean_data = dedupe_by_prompt(dataset)
+    assert len(clean_data) == unique
+    assert [item['response'] for item in clean_data] == [str(i) for i in range(unique)]
@@ -1,77 +1,120 @@
 # tests/test_integration_lab_connection.py
 
-import unittest
 import os
-import time
 import uuid
-import json
-from splunklib import results
-
-@unittest.skipIf(not os.environ.get('RUN_INTEGRATION_TESTS'),
-                 "Skipping integration tests. Set RUN_INTEGRATION_TESTS=1 to run.")
-class TestLiveLabConnection(unittest.TestCase):
-    @classmethod
-    def setUpClass(cls):
-        from powershell_sentinel.models import CommandOutput, SplunkLogEvent
-        from powershell_sentinel.lab_connector import LabConnection
-        
-        cls.CommandOutput = CommandOutput
-        cls.SplunkLogEvent = SplunkLogEvent
-
-        print("\n--- Initializing Live Lab Connection for Integration Test ---")
+import queue
+import itertools
+import threading
+import pytest
+
+pytestmark = pytest.mark.integration
+
+# With SENTINEL_CACHE_LAB=1 the canary from the previous run (still in the Splunk
+# index) is searched for again instead of re-executing the remote command.
+# Intended for local re-runs only; CI should always do the full loop.
+CACHE_LAB = os.environ.get('SENTINEL_CACHE_LAB') == '1'
+# The PowerShell -> Splunk full loop takes up to minutes; it only runs with RUN_E2E=1.
+RUN_E2E = bool(os.environ.get('RUN_E2E'))
+CANARY_CACHE_KEY = "sentinel/lab_canary"
+SEARCH_QUERY_TEMPLATE = 'search index=main host=PS-VICTIM-01 "{}"'
+# Canaries only need to be unique per run: one random run id, then a counter.
+RUN_ID = uuid.uuid4().hex
+_canary_counter = itertools.count()
+# Outer bound on top of max_wait: splunklib's HTTP calls have no socket timeout of their own.
+SEARCH_DEADLINE_SLACK_SEC = 15
+
+
+def _search_for(lab, canary_string, max_wait=120, earliest_time="-5m"):
+    print(f"[INFO] Waiting for Splunk log containing: '{canary_string}'")
+    outcome = queue.Queue()
+
+    def search():
         try:
-            cls.lab = LabConnection()
-            print("[SUCCESS] LabConnection initialized successfully.")
-        except Exception as e:
-            raise unittest.SkipTest(f"Failed to initialize LabConnection. Error: {e}")
-
-    @classmethod
-    def tearDownClass(cls):
-        if hasattr(cls, 'lab') and cls.lab:
-            cls.lab.close()
-
-    def test_full_loop_connectivity(self):
-        canary_string = f"integration-test-canary-{uuid.uuid4()}"
-        
-        # [REVISED] Use a command that produces pipeline output, not host output.
-        command = f'"{canary_string}"'
-        print(f"\n[INFO] Executing canary command: {command}")
-
-        exec_result = self.lab.run_remote_powershell(command)
-        
-        self.assertIsInstance(exec_result, self.CommandOutput)
-        self.assertEqual(exec_result.return_code, 0, f"PowerShell command failed. Stderr: {exec_result.stderr}")
-        
+            outcome.put((True, lab.query_splunk_blocking(SEARCH_QUERY_TEMPLATE.format(canary_string),
+                                                         max_wait=max_wait, earliest_time=earliest_time)))
+        except BaseException as e:
+            outcome.put((False, e))
+
+    # A daemon thread, not an executor: executor workers are joined at interpreter exit,
+    # so a stalled request would hang the whole session even after the deadline passed.
+    worker = threading.Thread(target=search, daemon=True)
+    worker.start()
+    worker.join(max_wait + SEARCH_DEADLINE_SLACK_SEC)
+    if worker.is_alive():
+        return None
+    succeeded, found_log = outcome.get_nowait()
+    if not succeeded:
+        raise found_log
+    return found_log
+
+
+def _next_canary():
+    # No dashes: Splunk tokenizes on '-', which made the phrase search flaky.
+    return f"canary{RUN_ID}x{next(_canary_counter)}"
+
+
+@pytest.fixture(scope='session')
+def canary_event(lab, request):
+    """
+    Runs the canary command and polls Splunk for its log once per session.
+    Returns (canary_string, exec_result, found_log); exec_result is None when
+    the canary was reused from a previous run via SENTINEL_CACHE_LAB=1.
+    """
+    cache = getattr(request.config, 'cache', None)
+    if CACHE_LAB and cache is not None:
+        cached_canary = cache.get(CANARY_CACHE_KEY, None)
+        if cached_canary:
+            found_log = _search_for(lab, cached_canary, max_wait=5, earliest_time="-24h")
+            if found_log is not None:
+                print(f"\n[INFO] Reusing cached canary: {cached_canary}")
+                return cached_canary, None, found_log
+
+    canary_string = _next_canary()
+
+    # [REVISED] Use a command that produces pipeline output, not host output.
+    command = f'"{canary_string}"'
+    print(f"\n[INFO] Executing canary command: {command}")
+    exec_result = lab.run_remote_powershell(command)
+
+    found_log = _search_for(lab, canary_string) if exec_result.return_code == 0 else None
+    if found_log is not None and cache is not None:
+        cache.set(CANARY_CACHE_KEY, canary_string)
+    return canary_string, exec_result, found_log
+
+
+def test_splunk_indexing_only(lab):
+    """
+    Seeds the canary straight into the index over the authenticated management
+    connection (no PowerShell round-trip) and checks it can be searched back.
+    """
+    from powershell_sentinel.models import SplunkLogEvent
+
+    canary_string = _next_canary()
+    print(f"\n[INFO] Submitting canary event: {canary_string}")
+    lab.splunk_service.indexes['main'].submit(canary_string, host="PS-VICTIM-01",
+                                              source="sentinel_integration_test", sourcetype="sentinel:canary")
+
+    found_log = _search_for(lab, canary_string)
+    assert found_log is not None, f"TEST FAILED: Timed out waiting for seeded canary event."
+    assert isinstance(found_log, SplunkLogEvent)
+    assert canary_string in found_log.raw, "Canary string not found in raw log."
+    print("[SUCCESS] Seeded event indexed and found.")
+
+
+@pytest.mark.skipif(not RUN_E2E, reason="Full PowerShell-to-Splunk loop. Set RUN_E2E=1 to run.")
+def test_full_loop_connectivity(canary_event):
+    from powershell_sentinel.models import CommandOutput, SplunkLogEvent
+
+    canary_string, exec_result, found_log = canary_event
+
+    if exec_result is not None:
+        assert isinstance(exec_result, CommandOutput)
+        assert exec_result.return_code == 0, f"PowerShell command failed. Stderr: {exec_result.stderr}"
         # [REVISED] The canary string is now in the parsed stdout field.
-        self.assertIn(canary_string, exec_result.stdout, "Canary string not found in command stdout.")
+        assert canary_string in exec_result.stdout, "Canary string not found in command stdout."
         print(f"[SUCCESS] Remote command executed successfully on host.")
 
-        # The Splunk polling logic is correct and remains unchanged.
-        print(f"[INFO] Polling Splunk for log containing: '{canary_string}'")
-        search_query = f'search index=main host=PS-VICTIM-01 "{canary_string}"'
-        
-        found_log = None
-        timeout_seconds = 120
-        poll_interval = 5
-
-        job = self.lab.splunk_service.jobs.create(search_query)
-        try:
-            for i in range(timeout_seconds // poll_interval):
-                job.refresh()
-                if job.is_done():
-                    reader = results.JSONResultsReader(job.results(output_mode='json'))
-                    logs = [self.SplunkLogEvent.model_validate(item) for item in reader if isinstance(item, dict)]
-                    if logs:
-                        found_log = logs[0]
-                        break
-                time.sleep(poll_interval)
-        finally:
-            job.cancel()
-        
-        self.assertIsNotNone(found_log, f"TEST FAILED: Timed out waiting for canary log.")
-        self.assertIsInstance(found_log, self.SplunkLogEvent)
-        self.assertIn(canary_string, found_log.raw, "Canary string not found in raw log.")
-        print("[SUCCESS] Log content validated.")
-
-if __name__ == '__main__':
-    unittest.main()
\ No newline at end of file
+    assert found_log is not None, f"TEST FAILED: Timed out waiting for canary log."
+    assert isinstance(found_log, SplunkLogEvent)
+    assert canary_string in found_log.raw, "Canary string not found in raw log."
+    print("[SUCCESS] Log content validated.")
@@ -1,8 +1,14 @@
 # tests/test_lab_connection.py
 
-import unittest
+import io
+import copy
 import json
-from unittest.mock import patch, MagicMock
+import base64
+from types import SimpleNamespace
+
+import pytest
+from winrm import Protocol
+from unittest.mock import patch, Mock, create_autospec
 
 MOCK_ENV = {
     'VICTIM_VM_IP': '1.2.3.4',
@@ -11,61 +17,163 @@ MOCK_ENV = {
     'SPLUNK_PASS': 'splunkpass'
 }
 
-with patch.dict('os.environ', MOCK_ENV, clear=True):
-    from powershell_sentinel.lab_connector import LabConnection
-    from powershell_sentinel.models import CommandOutput, SplunkLogEvent
+from powershell_sentinel.lab_connector import LabConnection
+from powershell_sentinel.models import CommandOutput, SplunkLogEvent
 
-class TestLabConnection(unittest.TestCase):
 
-    def setUp(self):
-        self.connect_winrm_patcher = patch('powershell_sentinel.lab_connector.LabConnection._connect_winrm')
-        self.connect_splunk_patcher = patch('powershell_sentinel.lab_connector.LabConnection._connect_splunk')
-        self.mock_connect_winrm = self.connect_winrm_patcher.start()
-        self.mock_connect_splunk = self.connect_splunk_patcher.start()
-        self.addCleanup(self.connect_winrm_patcher.stop)
-        self.addCleanup(self.connect_splunk_patcher.stop)
+@pytest.fixture(scope='module', autouse=True)
+def lab_settings():
+    """
+    lab_connector reads its settings into module constants at import time, so those are
+    patched directly rather than os.environ; this holds regardless of import order.
+    """
+    with patch.multiple('powershell_sentinel.lab_connector', **MOCK_ENV):
+        yield
 
-    def test_run_remote_powershell_success(self):
-        lab = LabConnection()
-        lab.winrm_protocol = MagicMock()
-        lab.shell_id = 'mock_shell_id'
-        
-        mock_response_dict = {"Stdout": "Success", "Stderr": "", "ReturnCode": 0}
-        mock_response_bytes = json.dumps(mock_response_dict).encode('utf-8')
-        lab.winrm_protocol.get_command_output.return_value = (mock_response_bytes, b'', 0)
+with open('tests/test_data/lab_transport_responses.json', 'r', encoding='utf-8') as f:
+    TRANSPORT_RESPONSES = json.load(f)
 
-        result = lab.run_remote_powershell("hostname")
+# Response bodies are encoded once; each test only wraps them in a fresh stream.
+WINRM_OUTPUTS = {
+    name: (base64.b64decode(exchange['stdout_b64']), base64.b64decode(exchange['stderr_b64']), exchange['rc'])
+    for name, exchange in TRANSPORT_RESPONSES['winrm_exchanges'].items()
+}
+SPLUNK_RESULTS_BYTES = json.dumps(TRANSPORT_RESPONSES['splunk_results']).encode('utf-8')
+MINIMAL_RESULTS_BYTES = json.dumps(
+    {"results": [{'_raw': 'log1', '_time': 'time', 'source': 's', 'sourcetype': 'st'}]}).encode('utf-8')
 
-        lab.winrm_protocol.run_command.assert_called_once()
-        self.assertEqual(result.return_code, 0)
-        self.assertEqual(result.stdout, "Success")
+def _replay(name):
+    """
+    A winrm.Protocol factory replaying the named recorded exchange. The protocol is
+    autospecced, so a call to a method winrm.Protocol lacks, or with the wrong
+    signature, fails instead of passing silently.
+    """
+    exchange = TRANSPORT_RESPONSES['winrm_exchanges'][name]
 
-    def test_run_remote_powershell_failure(self):
-        lab = LabConnection()
-        lab.winrm_protocol = MagicMock()
-        lab.shell_id = 'mock_shell_id'
-        
-        mock_response_dict = {"Stdout": "", "Stderr": "command not found", "ReturnCode": 1}
-        mock_response_bytes = json.dumps(mock_response_dict).encode('utf-8')
-        lab.winrm_protocol.get_command_output.return_value = (mock_response_bytes, b'', 0)
-        
-        result = lab.run_remote_powershell("invalid-command")
-        
-        lab.winrm_protocol.run_command.assert_called_once()
-        self.assertEqual(result.return_code, 1)
-        self.assertEqual(result.stderr, "command not found")
-
-    @patch('powershell_sentinel.lab_connector.results.JSONResultsReader')
-    def test_query_splunk_success(self, mock_json_reader):
-        lab = LabConnection()
-        lab.splunk_service = MagicMock()
-        mock_job = MagicMock()
-        lab.splunk_service.jobs.create.return_value = mock_job
-        mock_json_reader.return_value = [{'_raw': 'log1', '_time': 'time', 'source': 's', 'sourcetype': 'st'}]
+    def factory(**kwargs):
+        protocol = create_autospec(Protocol, instance=True)
+        protocol.open_shell.return_value = exchange['shell_id']
+        protocol.run_command.return_value = exchange['command_id']
+        protocol.get_command_output.return_value = WINRM_OUTPUTS[name]
+        return protocol
+    return factory
+
+
+def _splunk_stream():
+    return io.BytesIO(SPLUNK_RESULTS_BYTES)
+
+
+@pytest.fixture(scope='module')
+def prototype_lab(lab_settings):
+    """Constructed once, with the connect methods stubbed only for construction."""
+    with patch.multiple(LabConnection, _connect_winrm=Mock(), _connect_splunk=Mock()):
+        return LabConnection()
+
+
+@pytest.fixture
+def offline_lab(prototype_lab):
+    """A shallow copy per test, so the protocol/service each test swaps in never leaks."""
+    return copy.copy(prototype_lab)
+
+
+@pytest.mark.parametrize("command, exchange, expected", [
+    ("hostname", "hostname", (0, "Success", "")),
+    ("invalid-command", "command_not_found", (1, "", "command not found")),
+])
+def test_run_remote_powershell(offline_lab, command, exchange, expected):
+    offline_lab.winrm_protocol = _replay(exchange)()
+    offline_lab.shell_id = offline_lab.winrm_protocol.open_shell()
+
+    result = offline_lab.run_remote_powershell(command)
+
+    offline_lab.winrm_protocol.run_command.assert_called_once()
+    assert (result.return_code, result.stdout, result.stderr) == expected
+
+
+def test_query_splunk_success(offline_lab):
+    mock_job = Mock(results=Mock(return_value=io.BytesIO(MINIMAL_RESULTS_BYTES)))
+    offline_lab.splunk_service = SimpleNamespace(jobs=SimpleNamespace(create=Mock(return_value=mock_job)))
+    
+    results = offline_lab.query_splunk("search *")
         
-        results = lab.query_splunk("search *")
-            
-        self.assertEqual(len(results), 1)
+    assert len(results) == 1
+
+
+def test_query_splunk_returns_every_row(offline_lab):
+    rows = [{'_raw': f'log{i}', '_time': 'time', 'source': 's', 'sourcetype': 'st'} for i in range(3)]
+    mock_job = Mock(results=Mock(return_value=io.BytesIO(json.dumps({"results": rows}).encode('utf-8'))))
+    offline_lab.splunk_service = SimpleNamespace(jobs=SimpleNamespace(create=Mock(return_value=mock_job)))
+
+    results = offline_lab.query_splunk("search *")
+
+    assert [log.raw for log in results] == ['log0', 'log1', 'log2']
+
+
+# --- Offline variant of the live full-loop test: only the transports are faked,
+# --- so the connection wiring and the Pydantic round-trips run for real.
+
+@pytest.fixture(scope='module')
+def transport_lab(lab_settings):
+    """Built once over a replayed WinRM exchange and a namespace Splunk service."""
+    splunk_service = SimpleNamespace(jobs=SimpleNamespace())
+    with patch('powershell_sentinel.lab_connector.winrm.Protocol', _replay('echo_hi')), \
+         patch('powershell_sentinel.lab_connector.client.connect', return_value=splunk_service):
+        return LabConnection()
+
+
+@pytest.fixture
+def splunk_jobs(transport_lab):
+    """
+    Installs fresh Splunk job mocks for each test: plain Mocks on a namespace give call
+    tracking where tests assert on it, without MagicMock's magic-method setup.
+    """
+    jobs = transport_lab.splunk_service.jobs
+    jobs.create = Mock(return_value=Mock(results=Mock(side_effect=lambda **kwargs: _splunk_stream())))
+    jobs.oneshot = Mock(side_effect=lambda *args, **kwargs: _splunk_stream())
+    transport_lab.winrm_protocol.reset_mock()
+    return jobs
+
+
+def test_run_remote_powershell_round_trip(transport_lab, splunk_jobs):
+    result = transport_lab.run_remote_powershell("echo hi")
+
+    assert isinstance(result, CommandOutput)
+    assert result.return_code == 0
+    assert result.stdout == "hi"
+    _, command, args = transport_lab.winrm_protocol.run_command.call_args.args
+    assert (command, args[0]) == ('powershell.exe', '-EncodedCommand')
+
+
+def test_query_splunk_round_trip(transport_lab, splunk_jobs):
+    logs = transport_lab.query_splunk('index=main "echo hi"')
+
+    assert len(logs) == 1
+    assert isinstance(logs[0], SplunkLogEvent)
+    assert "echo hi" in logs[0].raw
+
+
+def test_query_splunk_blocking_returns_first_event(transport_lab, splunk_jobs):
+    log = transport_lab.query_splunk_blocking('index=main "echo hi"', max_wait=1)
+
+    assert isinstance(log, SplunkLogEvent)
+    assert log.sourcetype == "XmlWinEventLog"
+    splunk_jobs.oneshot.assert_called_once()
+
+
+def test_query_splunk_blocking_backs_off_until_indexed(transport_lab, splunk_jobs, monkeypatch):
+    sleeps = []
+    monkeypatch.setattr('powershell_sentinel.lab_connector.time.sleep', sleeps.append)
+    streams = iter([io.BytesIO(b''), io.BytesIO(b'{"results": []}'), _splunk_stream()])
+    splunk_jobs.oneshot.side_effect = lambda *args, **kwargs: next(streams)
+
+    log = transport_lab.query_splunk_blocking('index=main "echo hi"', max_wait=60)
+
+    assert isinstance(log, SplunkLogEvent)
+    assert sleeps == [0.1, 0.2]
+
+
+def test_query_splunk_blocking_does_not_retry_failed_query(transport_lab, splunk_jobs):
+    splunk_jobs.oneshot.side_effect = RuntimeError("search parser error")
 
-if __name__ == '__main__':
-    unittest.main()
\ No newline at end of file
+    assert transport_lab.query_splunk_blocking('index=main "echo hi"', max_wait=60) is None
+    splunk_jobs.oneshot.assert_called_once()
@@ -1,71 +1,45 @@
 # Phase 3: Data Factory - Generation & MLOps Prep
 # Index: [12]
 
-import unittest
-import os
-import json
-import tempfile
-from unittest.mock import patch, MagicMock
-
-# Import the necessary functions and models
-from powershell_sentinel.main_data_factory import generate_dataset
-from powershell_sentinel.models import CommandOutput
-
-class TestMasterPipelineSmoke(unittest.TestCase):
-
-    def setUp(self):
-        """Use a temporary directory for true test isolation."""
-        self.temp_dir = tempfile.TemporaryDirectory()
-        self.primitives_path = os.path.join(self.temp_dir.name, "primitives.json")
-        self.output_path = os.path.join(self.temp_dir.name, "output.json")
-        
-        # The mock primitive MUST have telemetry_rules to be considered "usable".
-        mock_primitives = [{
-            "primitive_id": "PS-001",
-            "primitive_command": "Get-Process",
-            "intent": ["Process Discovery"],
-            "mitre_ttps": ["T1057"],
-            "telemetry_rules": [{"source": "A", "event_id": 1, "details": "B"}]
-        }]
-        with open(self.primitives_path, 'w') as f:
-            json.dump(mock_primitives, f)
-
-    def tearDown(self):
-        """Clean up the temporary directory."""
-        self.temp_dir.cleanup()
-
-    @patch('powershell_sentinel.main_data_factory.LabConnection')
-    @patch('powershell_sentinel.main_data_factory.generate_layered_obfuscation')
-    def test_smoke_run_completes_successfully(self, mock_obfuscator, mock_lab_connection):
-        """
-        E2E smoke test to ensure the main data factory pipeline runs without errors.
-        """
-        # --- Arrange: Configure mocks to always "succeed" ---
-        
-        mock_obfuscator.return_value = ("obfuscated_cmd", ["obfuscate_concat"])
-        
-        mock_lab_instance = mock_lab_connection.return_value
-        
-        # The mock CommandOutput object MUST be created using the
-        # aliased, PowerShell-style field names (PascalCase) to pass validation.
-        mock_lab_instance.run_remote_powershell.return_value = CommandOutput(
-            ReturnCode=0, 
-            Stdout='Success', 
-            Stderr=''
-        )
-        
-        # --- Act ---
-        target_count = 5
-        generate_dataset(target_count, self.primitives_path, self.output_path)
-        
-        # --- Assert ---
-        self.assertTrue(os.path.exists(self.output_path))
-        with open(self.output_path, 'r') as f:
-            data = json.load(f)
-        self.assertEqual(len(data), target_count)
-        self.assertEqual(data[0]['prompt'], "obfuscated_cmd")
-        self.assertEqual(data[0]['response']['deobfuscated_command'], "Get-Process")
-
-
-if __name__ == '__main__':
-    unittest.main()
\ No newline at end of file
+from unittest.mock import patch
+
+# Import the necessary functions
+from powershell_sentinel.main_data_factory import main, save_state, OUTPUT_FILE
+
+# Never opened: load_primitives is patched to return the mock library.
+PRIMITIVES_PATH = "primitives.json"
+# One technique per recipe, so each recipe is one job and one engine call.
+RECIPES = [["Invoke-SentinelConcat"], ["Invoke-SentinelType"], ["Invoke-SentinelFormat"]]
+# Returned as-is on every engine call, so it is fully immutable: nothing the factory does can alter it.
+ENGINE_RESULT = (True, "obfuscated_cmd")
+
+
+@patch('powershell_sentinel.main_data_factory.load_primitives')
+@patch('powershell_sentinel.main_data_factory.generate_all_recipes', return_value=RECIPES)
+@patch('powershell_sentinel.main_data_factory.invoke_sentinel_engine', return_value=ENGINE_RESULT)
+@patch('powershell_sentinel.lab_connector.LabConnection')
+def test_smoke_run_completes_successfully(mock_lab_connection, mock_engine, mock_recipes, mock_load_primitives, mock_primitives, success_output, factory_workdir):
+    """
+    E2E smoke test to ensure the main data factory pipeline runs without errors.
+    """
+    # --- Arrange: Configure mocks to always "succeed" ---
+    mock_load_primitives.return_value = mock_primitives
+    
+    mock_lab_instance = mock_lab_connection.return_value
+    mock_lab_instance.run_remote_powershell.return_value = success_output
+    
+    # --- Act ---
+    # save_state still writes the files; the final pairs and completed jobs are read from
+    # its arguments, not back off disk.
+    with patch('powershell_sentinel.main_data_factory.save_state', wraps=save_state) as mock_save_state:
+        main(PRIMITIVES_PATH, dry_run=False)
+    
+    # --- Assert ---
+    mock_load_primitives.assert_called_once_with(PRIMITIVES_PATH)
+    assert (factory_workdir / OUTPUT_FILE).exists()
+    data, completed_jobs = mock_save_state.call_args.args[:2]
+    assert len(data) == len(RECIPES)
+    assert completed_jobs == {("PS-001", tuple(recipe)) for recipe in RECIPES}
+    assert data[0].prompt == "obfuscated_cmd"
+    assert data[0].response.deobfuscated_command == "Get-Process"
+    mock_lab_instance.close.assert_called_once()